@@ -23,11 +23,17 @@ __version__ = '0.1.0'
 
 from .node import *
 from .tree import *
-
-__all__ = ["Node", "is_node", "is_left", "is_right", "is_leaf", "is_root", 
-           "is_orphan", "from_string", "from_orders", "connect_nodes",
-           "to_string", "traverse_pre_order", "traverse_in_order",
-           "traverse_post_order", "traverse_level_order", "traverse",
-           "is_symmetrical", "max_depth", "get_path", "all_paths", "has_sum",
-           "find_path", "get_lca"]
-
+from .concurrency import *
+from .index import *
+
+__all__ = ["Node", "LightNode", "generation", "is_node", "is_left",
+           "is_right", "is_leaf", "is_root", "is_orphan", "from_string",
+           "from_values", "from_orders", "load_trees", "copy_tree",
+           "connect_nodes", "to_string", "traverse_pre_order",
+           "traverse_in_order", "traverse_post_order", "traverse_level_order",
+           "traverse",
+           "is_symmetrical", "max_depth", "get_path", "all_paths",
+           "iter_paths", "visit_paths", "has_sum", "find_path", "get_lca",
+           "get_node", "with_value", "with_subtree", "diff", "patch",
+           "QueryCache", "RWLock", "Transaction", "ConcurrentTree",
+           "PathIndex"]
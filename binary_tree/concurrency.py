@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains classes for sharing a binary tree between threads."""
+
+from .tree import traverse, _check_persistent, _copy_path
+import contextlib
+import threading
+
+class RWLock(object):
+    """A readers-writer lock.
+
+    Any number of readers can hold the lock at once, while a writer holds it alone. Waiting writers are let in before new readers.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writers = 0  # Writers that are waiting or writing.
+        self._writing = False
+
+    @contextlib.contextmanager
+    def read_lock(self):
+        """Hold the lock for reading within a ``with`` block."""
+        with self._condition:
+            while self._writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def write_lock(self):
+        """Hold the lock for writing within a ``with`` block."""
+        with self._condition:
+            self._writers += 1
+            while self._readers or self._writing:
+                self._condition.wait()
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._writers -= 1
+                self._condition.notify_all()
+
+class Transaction(object):
+    """A batch of updates to a :class:`~binary_tree.ConcurrentTree`.
+
+    Updates copy the path from the root like :func:`~binary_tree.tree.with_value`, but nodes that were already copied in the same transaction are updated in place.
+
+    Attributes:
+        root: The root :class:`~binary_tree.LightNode` instance with the updates so far.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._fresh = {}
+
+    def _check_open(self):
+        if self._fresh is None:
+            raise ValueError("The transaction is closed")
+
+    def close(self):
+        """Stop any further updates, so the nodes copied so far are never changed again."""
+        self._fresh = None
+
+    def set_value(self, sides, value):
+        """Set the value at a structural position.
+
+        Args:
+            sides (iterable[str, ...]): The sides (``"left"`` or ``"right"``) to follow from the root.
+            value: The new value.
+
+        Raises:
+            ValueError: If there is no node at `sides`, or the transaction is closed.
+        """
+        self._check_open()
+        path = _copy_path(self.root, sides, self._fresh)
+        path[-1].value = value
+        self.root = path[0]
+
+    def set_subtree(self, sides, subtree):
+        """Set the subtree at a structural position.
+
+        Args:
+            sides (sequence[str, ...]): The sides (``"left"`` or ``"right"``) to follow from the root.
+            subtree: A :class:`~binary_tree.LightNode` instance, or ``None`` to remove the subtree at `sides`.
+
+        Raises:
+            TypeError: If `subtree` or the nodes on the path have :attr:`~binary_tree.Node.parent` links.
+            ValueError: If there is no parent node for `sides`, or the transaction is closed.
+        """
+        self._check_open()
+        if subtree is not None:
+            _check_persistent(subtree)
+        sides = tuple(sides)
+        if not sides:
+            self.root = subtree
+            return
+        path = _copy_path(self.root, sides[:-1], self._fresh)
+        setattr(path[-1], sides[-1], subtree)
+        self.root = path[0]
+
+class ConcurrentTree(object):
+    """A binary tree structure shared between reader threads and writer threads.
+
+    Writers never change a published version. Instead, each :meth:`~binary_tree.ConcurrentTree.transaction` builds a new version by path copying and publishes it at once, so readers always see a consistent version and only hold the lock while taking a :meth:`~binary_tree.ConcurrentTree.snapshot`.
+
+    Example:
+        ::
+
+          shared = ConcurrentTree(from_string("1,2,3", cls=LightNode))
+
+          with shared.transaction() as txn:
+              txn.set_value(["left"], 4)
+              txn.set_subtree(["right", "left"], LightNode(5))
+
+          values = [node.value for node in shared.traverse("in")]
+
+    Attributes:
+        version (int): The number of published transactions.
+
+    Note:
+        The nodes must not have :attr:`~binary_tree.Node.parent` links, so use :class:`~binary_tree.LightNode` instances.
+    """
+
+    def __init__(self, root=None):
+        if root is not None:
+            _check_persistent(root)
+        self._root = root
+        self.version = 0
+        self._lock = RWLock()
+        self._writer = threading.Lock()
+
+    def snapshot(self):
+        """Get the current version.
+
+        Returns:
+            The root :class:`~binary_tree.LightNode` instance of the current version, which is never changed by writers.
+        """
+        with self._lock.read_lock():
+            return self._root
+
+    def traverse(self, kind, prune=None, max_depth=None, start=None):
+        """Traverse the current version.
+
+        Args:
+            kind (str): "pre" or "in" or "post" or "level".
+            prune (callable): Called with a :class:`~binary_tree.LightNode` instance and a side (``"left"`` or ``"right"``). If it returns ``True``, the subtree on that side is not visited.
+            max_depth (int): The number of levels to visit. Defaults to every level.
+            start: A key or :class:`~binary_tree.LightNode` instance to seek to in a binary search tree. Only for in-order traversal.
+
+        Returns:
+            An iterator over the :func:`~binary_tree.tree.traverse` of the current version, which is unaffected by later transactions.
+
+        Raises:
+            KeyError: If `kind` is not one of the possible options.
+            ValueError: If `start` is given for a `kind` other than "in".
+        """
+        return traverse(self.snapshot(), kind, prune, max_depth, start)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Batch updates within a ``with`` block.
+
+        Transactions run one at a time. The updates are published together when the block exits, or discarded if it raises an exception. Either way, the transaction is closed afterwards.
+
+        Yields:
+            A :class:`~binary_tree.Transaction` based on the current version.
+        """
+        with self._writer:
+            txn = Transaction(self.snapshot())
+            try:
+                yield txn
+            finally:
+                txn.close()
+            with self._lock.write_lock():
+                self._root = txn.root
+                self.version += 1
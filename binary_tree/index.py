@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains an index for queries on the paths of a binary tree."""
+
+import operator
+
+_OPS = {"sum": operator.add, "min": min, "max": max}
+
+class PathIndex(object):
+    """An index for aggregate queries on the path between two nodes of a binary tree structure.
+
+    The binary tree structure is split into chains by heavy-light decomposition, so the path between any two nodes crosses O(log n) chains. Each chain is a range in one segment tree per aggregate, so a query takes O(log^2 n) time. The segment tree of an aggregate is built the first time it is queried, and kept for the named aggregates and the last custom function only.
+
+    Example:
+        ::
+
+          root = from_string("1,2,3,4,,5,6")
+          index = PathIndex(root)
+
+          index.path_aggregate(root.left.left, root.right.right, "sum")  # 16
+          index.update(root, 10)
+          index.path_aggregate(root.left.left, root.right.right, "sum")  # 25
+
+    Note:
+        The binary tree structure should not be changed after the index is built, besides the values that are set through :meth:`~binary_tree.PathIndex.update`.
+    """
+
+    def __init__(self, root):
+        nodes = []
+        parents = []
+        depths = []
+        children = []
+        stack = [(root, None, 0)]
+        while stack:
+            node, parent, depth = stack.pop()
+            nodes.append(node)
+            parents.append(parent)
+            depths.append(depth)
+            children.append([])
+            if parent is not None:
+                children[parent].append(len(nodes) - 1)
+            for side in ["right", "left"]:
+                child = getattr(node, side)
+                if child is not None:
+                    stack.append((child, len(nodes) - 1, depth + 1))
+        # Parents come before their children, so sizes add up in reverse.
+        sizes = [1] * len(nodes)
+        for i in range(len(nodes) - 1, 0, -1):
+            sizes[parents[i]] += sizes[i]
+        heads = [0] * len(nodes)
+        positions = [0] * len(nodes)
+        position = 0
+        stack = [0]
+        while stack:
+            i = stack.pop()
+            while i is not None:  # Walk down the heavy chain of i.
+                positions[i] = position
+                position += 1
+                heavy = None
+                for child in children[i]:
+                    if heavy is None or sizes[child] > sizes[heavy]:
+                        heavy = child
+                for child in children[i]:
+                    if child != heavy:
+                        heads[child] = child
+                        stack.append(child)
+                if heavy is not None:
+                    heads[heavy] = heads[i]
+                i = heavy
+        self._nodes = nodes
+        self._ids = dict((id(node), i) for i, node in enumerate(nodes))
+        self._parents = parents
+        self._depths = depths
+        self._heads = heads
+        self._positions = positions
+        self._trees = {}
+
+    def _index(self, node):
+        try:
+            return self._ids[id(node)]
+        except KeyError:
+            raise ValueError(repr(node) + " is not in the index")
+
+    def _tree(self, op):
+        """Get the aggregate function and segment tree of `op`, building the tree if needed.
+
+        The trees of the named aggregates are kept, but only the tree of the last custom function is.
+        """
+        if op in _OPS:
+            func = _OPS[op]
+        elif isinstance(op, str):
+            raise KeyError("Invalid argument for op. "
+                           "Expected \"sum\", \"min\", \"max\" or a function")
+        else:
+            func = op
+        if op not in self._trees:
+            if func is op:
+                for key in [key for key in self._trees if key not in _OPS]:
+                    del self._trees[key]
+            size = len(self._nodes)
+            tree = [None] * (2 * size)
+            for i, node in enumerate(self._nodes):
+                tree[size + self._positions[i]] = node.value
+            for i in range(size - 1, 0, -1):
+                tree[i] = func(tree[2 * i], tree[2 * i + 1])
+            self._trees[op] = tree
+        return func, self._trees[op]
+
+    def _query(self, tree, op, lo, hi):
+        """Aggregate the positions from `lo` to `hi` (inclusive) in `tree`."""
+        result = None
+        lo += len(self._nodes)
+        hi += len(self._nodes) + 1
+        while lo < hi:
+            if lo & 1:
+                result = tree[lo] if result is None else op(result, tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                result = tree[hi] if result is None else op(result, tree[hi])
+            lo >>= 1
+            hi >>= 1
+        return result
+
+    def path_aggregate(self, a, b, op):
+        """Aggregate the values on the path between `a` and `b`.
+
+        Args:
+            a: A :class:`~binary_tree.Node` instance in the index.
+            b: A :class:`~binary_tree.Node` instance in the index.
+            op: ``"sum"`` or ``"min"`` or ``"max"``, or any function that combines two values associatively and commutatively. Only the segment tree of the last function is kept, so pass the same function object to reuse it.
+
+        Returns:
+            The aggregate of the values of every :class:`~binary_tree.Node` instance on the path from `a` to `b`, including both.
+
+        Raises:
+            KeyError: If `op` is a string other than the possible options.
+            ValueError: If `a` or `b` is not in the index.
+        """
+        op, tree = self._tree(op)
+        a, b = self._index(a), self._index(b)
+        heads, depths, positions = self._heads, self._depths, self._positions
+        result = None
+        while heads[a] != heads[b]:
+            if depths[heads[a]] < depths[heads[b]]:
+                a, b = b, a
+            value = self._query(tree, op, positions[heads[a]], positions[a])
+            result = value if result is None else op(result, value)
+            a = self._parents[heads[a]]
+        if positions[a] > positions[b]:
+            a, b = b, a
+        value = self._query(tree, op, positions[a], positions[b])
+        return value if result is None else op(result, value)
+
+    def lca(self, a, b):
+        """Get the lowest common ancestor of `a` and `b`.
+
+        Args:
+            a: A :class:`~binary_tree.Node` instance in the index.
+            b: A :class:`~binary_tree.Node` instance in the index.
+
+        Returns:
+            The :class:`~binary_tree.Node` instance that is the lowest common ancestor of `a` and `b`.
+
+        Raises:
+            ValueError: If `a` or `b` is not in the index.
+        """
+        a, b = self._index(a), self._index(b)
+        heads, depths = self._heads, self._depths
+        while heads[a] != heads[b]:
+            if depths[heads[a]] < depths[heads[b]]:
+                a, b = b, a
+            a = self._parents[heads[a]]
+        return self._nodes[a if depths[a] < depths[b] else b]
+
+    def update(self, node, value):
+        """Set the value of `node` and update the index without rebuilding it.
+
+        Args:
+            node: A :class:`~binary_tree.Node` instance in the index.
+            value: The new value.
+
+        Raises:
+            ValueError: If `node` is not in the index.
+        """
+        i = self._index(node)
+        node.value = value
+        i = self._positions[i] + len(self._nodes)
+        for op, tree in self._trees.items():
+            op = _OPS.get(op, op)
+            j = i
+            tree[j] = value
+            while j > 1:
+                j >>= 1
+                tree[j] = op(tree[2 * j], tree[2 * j + 1])
@@ -13,7 +13,8 @@ class Node(object):
         next: The right neighbouring :class:`~binary_tree.Node` instance, if present.
         parent: The parent :class:`~binary_tree.Node` instance, if present.
     """
-    __slots__ = ["value", "_left", "_right", "_prev", "_next", "parent"]
+    __slots__ = ["_value", "_left", "_right", "_prev", "_next", "parent",
+                 "_version"]
 
     def __init__(self, value, **nodes):
         self.value = getattr(value, "value", value)
@@ -71,6 +72,56 @@ class Node(object):
                         next_level.append(child)
             level = next_level
 
+    def __reduce_ex__(self, protocol):
+        """Pickle ``self`` without recursing through its binary tree structure.
+
+        The top of the binary tree structure of ``self`` is flattened into pre-order values and child flags, and the :attr:`~binary_tree.Node.parent` and neighbour links are rebuilt when it is loaded. Any other :class:`~binary_tree.Node` instance is pickled as the top and the sides that lead from it to ``self``, so references to several nodes of one tree stay shared.
+
+        Subclasses of :class:`~binary_tree.Node` are pickled with the default protocol.
+        """
+        if type(self) is not Node:
+            return object.__reduce_ex__(self, protocol)
+        bits = []
+        top = self
+        while top.parent is not None:
+            parent = top.parent
+            if parent.left is top:
+                bits.append("0")
+            elif parent.right is top:
+                bits.append("1")
+            else:  # A stale parent link, so treat top as the top.
+                break
+            top = parent
+        if top is self:
+            return (_unflatten, (Node,) + _flatten(self))
+        bits.append("1")  # Keep the leading sides when packed into an int.
+        bits.reverse()
+        return (_get_descendant, (top, int("".join(bits), 2)))
+
+    def __copy__(self):
+        """Copy ``self`` alone, sharing its links with ``self``."""
+        cls, args, state = object.__reduce_ex__(self, 2)[:3]
+        copy = cls(*args)
+        if hasattr(copy, "__setstate__"):
+            copy.__setstate__(state)
+        else:
+            if isinstance(state, tuple):
+                state, slots = state
+                for attr, value in slots.items():
+                    setattr(copy, attr, value)
+            if state:
+                copy.__dict__.update(state)
+        return copy
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        _touch(self)
+
     @property
     def left(self):
         return getattr(self, "_left", None)
@@ -80,6 +131,9 @@ class Node(object):
         self._left = other
         if is_node(other):
             other.parent = self
+            _join(self, other)
+        else:
+            _touch(self)
 
     @property
     def right(self):
@@ -90,6 +144,9 @@ class Node(object):
         self._right = other
         if is_node(other):
             other.parent = self
+            _join(self, other)
+        else:
+            _touch(self)
 
     @property
     def prev(self):
@@ -111,16 +168,214 @@ class Node(object):
         if is_node(other):
             other._prev = self
 
+class LightNode(object):
+    """A slim unit of a binary tree structure without :attr:`~binary_tree.Node.parent` and neighbour links.
+
+    :attr:`~binary_tree.LightNode.left` and :attr:`~binary_tree.LightNode.right` are plain slots, so reading and writing them costs no more than any other attribute. Use it for read-mostly trees.
+
+    Attributes:
+        value: The node value.
+        left: The left child :class:`~binary_tree.LightNode` instance, if present.
+        right: The right child :class:`~binary_tree.LightNode` instance, if present.
+
+    Note:
+        The :mod:`~binary_tree.node` functions that rely on :attr:`~binary_tree.Node.parent` do not apply to :class:`~binary_tree.LightNode` instances. Functions in :mod:`~binary_tree.tree` that need ancestors search from the root instead.
+    """
+    __slots__ = ["value", "left", "right"]
+
+    def __init__(self, value, left=None, right=None):
+        self.value = value
+        self.left = left
+        self.right = right
+
+    def __str__(self):
+        return "LightNode(" + str(self.value) + ")"
+
+    def __repr__(self):
+        """Get the full representation of ``self``.
+
+        Follows the format of :meth:`Node.__repr__() <binary_tree.Node.__repr__>`.
+
+        Returns:
+            str: A full representation of ``self``.
+        """
+        args = [str(self.value)]
+        if self.left is not None or self.right is not None:
+            args.append("left=" + repr(self.left))
+            if self.right is not None:
+                args.append("right=" + repr(self.right))
+        return "LightNode(" + ", ".join(args) + ")"
+
+    def __eq__(self, other):
+        return self.value == getattr(other, "value", other)
+
+    def __ne__(self, other):
+        return self.value != getattr(other, "value", other)
+
+    def __iter__(self):
+        level = [self]
+        while level:
+            next_level = []
+            for node in level:
+                yield node
+                if node.left is not None:
+                    next_level.append(node.left)
+                if node.right is not None:
+                    next_level.append(node.right)
+            level = next_level
+
+    def __reduce_ex__(self, protocol):
+        """Pickle the binary tree structure of ``self`` without recursion.
+
+        The structure is flattened into pre-order values and child flags. Subtrees that are shared with other pickled :class:`~binary_tree.LightNode` instances are not shared after loading.
+
+        Subclasses of :class:`~binary_tree.LightNode` are pickled with the default protocol.
+        """
+        if type(self) is not LightNode:
+            return object.__reduce_ex__(self, protocol)
+        return (_unflatten, (LightNode,) + _flatten(self))
+
+def _flatten(root):
+    """Flatten `root` without recursion.
+
+    Returns:
+        A tuple of the list of values in pre-order, a :class:`bytearray` of flags per value (1 if there is a :attr:`~binary_tree.Node.left` node, 2 if there is a :attr:`~binary_tree.Node.right` node), and whether any neighbour nodes are connected.
+    """
+    values = []
+    flags = bytearray()
+    linked = False
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        values.append(node.value)
+        flag = 0
+        if node.left is not None:
+            flag |= 1
+        if node.right is not None:
+            flag |= 2
+            stack.append(node.right)
+        if flag & 1:
+            stack.append(node.left)
+        flags.append(flag)
+        linked = (linked or getattr(node, "prev", None) is not None
+                  or getattr(node, "next", None) is not None)
+    return values, flags, linked
+
+def _get_descendant(top, sides):
+    """Get a descendant of `top` when a :class:`~binary_tree.Node` instance is unpickled.
+
+    Args:
+        top: A root :class:`~binary_tree.Node` instance.
+        sides (int): The bits after the leading 1 are the sides to follow from `top`, with 0 for :attr:`~binary_tree.Node.left` and 1 for :attr:`~binary_tree.Node.right`.
+    """
+    node = top
+    for bit in bin(sides)[3:]:
+        node = node.right if bit == "1" else node.left
+    return node
+
+def _unflatten(cls, values, flags, linked):
+    """Construct a `cls` instance from the output of :func:`_flatten` without recursion.
+
+    Pre-order visits every level from left to right, so neighbour nodes are connected on the way if `linked` is ``True``.
+    """
+    root = None
+    last = []  # The last node seen at each depth.
+    stack = [(None, None, 0)]
+    for value, flag in zip(values, flags):
+        parent, side, depth = stack.pop()
+        node = cls(value)
+        if parent is None:
+            root = node
+        else:
+            setattr(parent, side, node)
+        if linked:
+            if depth == len(last):
+                last.append(node)
+            else:
+                last[depth].next = node
+                last[depth] = node
+        if flag & 2:
+            stack.append((node, "right", depth + 1))
+        if flag & 1:
+            stack.append((node, "left", depth + 1))
+    return root
+
+class _Version(object):
+    """The number of mutations of a binary tree structure, shared by its :class:`~binary_tree.Node` instances.
+
+    When two binary tree structures are joined, the version of one is merged into the other, and `merged` points to the version that replaces it.
+    """
+    __slots__ = ["count", "merged"]
+
+    def __init__(self):
+        self.count = 0
+        self.merged = None
+
+def _get_version(node, create=False):
+    """Get the version of the binary tree structure of `node`.
+
+    Returns:
+        The :class:`_Version` of `node`, or ``None`` if `node` has never been part of a binary tree structure and `create` is ``False``.
+    """
+    version = getattr(node, "_version", None)
+    if version is None:
+        if create:
+            version = node._version = _Version()
+        return version
+    top = version
+    while top.merged is not None:
+        top = top.merged
+    while version is not top:  # Point every merged version to the top.
+        version.merged, version = top, version.merged
+    node._version = top
+    return top
+
+def _touch(node):
+    """Count a mutation of the binary tree structure of `node`."""
+    if getattr(node, "_version", None) is not None:
+        _get_version(node).count += 1
+
+def _join(parent, child):
+    """Share one version between the binary tree structures of `parent` and `child`, counting the mutation."""
+    parent_version = _get_version(parent, True)
+    if getattr(child, "_version", None) is None:  # A new child, most often.
+        child._version = parent_version
+        parent_version.count += 1
+        return
+    child_version = _get_version(child)
+    if child_version is not parent_version:
+        child_version.merged = parent_version
+        parent_version.count = max(parent_version.count, child_version.count)
+    parent_version.count += 1
+
+def generation(node):
+    """Get the generation of the binary tree structure of `node`.
+
+    The generation goes up whenever the :attr:`~binary_tree.Node.value`, :attr:`~binary_tree.Node.left` or :attr:`~binary_tree.Node.right` of a :class:`~binary_tree.Node` instance in the same binary tree structure is set, so anything computed for it in an earlier generation may be stale. Constructing nodes that are not yet part of it does not change the generation.
+
+    Args:
+        node: A :class:`~binary_tree.Node` instance.
+
+    Returns:
+        int: The current generation.
+
+    Note:
+        A subtree that is detached keeps counting the mutations of the binary tree structure it was detached from. Mutations of :class:`~binary_tree.LightNode` instances are not counted, and their generation is always 0.
+    """
+    if not isinstance(node, Node):
+        return 0
+    return _get_version(node, True).count
+
 def is_node(obj):
-    """Check if `obj` is an instance of :class:`~binary_tree.Node`.
+    """Check if `obj` is an instance of :class:`~binary_tree.Node` or :class:`~binary_tree.LightNode`.
 
     Args:
         obj: Any object.
 
     Returns:
-        ``True`` if `obj` is an instance of :class:`~binary_tree.Node`, ``False`` otherwise.
+        ``True`` if `obj` is an instance of :class:`~binary_tree.Node` or :class:`~binary_tree.LightNode`, ``False`` otherwise.
     """
-    return isinstance(obj, Node)
+    return isinstance(obj, (Node, LightNode))
 
 def is_left(node):
     """Check if `node` is a :attr:`~binary_tree.Node.left` child.
@@ -62,3 +62,333 @@ def test_tree_from_in_post_orders(tree_from_in_post_orders):
     """Check the tree structure."""
     assert is_correct(tree_from_in_post_orders)
         
+
+@pytest.fixture
+def tree_from_LightNode():
+    """Test from_string with the LightNode class."""
+    return from_string(tree_string, cls=LightNode)
+
+def test_tree_from_LightNode(tree_from_LightNode):
+    """Check the tree structure and the tree functions."""
+    root = tree_from_LightNode
+    assert repr(root) == repr_string.replace("Node", "LightNode")
+    assert not hasattr(root, "parent")
+    assert [node.value for node in traverse(root, "in")] == in_order
+    assert [node.value for node in traverse(root, "post")] == post_order
+    assert [[node.value for node in path] for path in all_paths(root)] == [
+        [1,2,4], [1,3,5], [1,3,6]]
+    assert get_path(root.right.left, root) == [1,3,5]
+    assert get_lca(root, 5, 6) is root.right
+    assert get_lca(root, 4, 6) is root
+
+def test_persistent_updates(tree_from_LightNode):
+    """Check that new versions share the untouched nodes."""
+    old = tree_from_LightNode
+    new = with_value(old, ["right", "left"], 7)
+    new = with_subtree(new, ["left", "right"], LightNode(8))
+    assert repr(old) == repr_string.replace("Node", "LightNode")
+    assert to_string(new) == "1,2,3,4,8,7,6"
+    assert new.left.left is old.left.left
+    assert new.right.right is old.right.right
+    assert get_node(new, ["right", "left"]) == 7
+    assert get_path(get_node(new, ["left", "right"]), new) == [1,2,8]
+    with pytest.raises(TypeError):
+        with_value(from_string(tree_string), [], 0)
+
+def test_iter_paths(tree_from_string):
+    """Check the streamed leaf paths and their filters."""
+    root = tree_from_string
+    root.left.left.left = Node(7)
+    assert list(iter_paths(root)) == [(1,2,4,7), (1,3,5), (1,3,6)]
+    assert list(iter_paths(root, min_depth=4)) == [(1,2,4,7)]
+    assert list(iter_paths(root, max_depth=3)) == [(1,3,5), (1,3,6)]
+    sums = []
+    visit_paths(root, lambda values: sums.append(sum(values)))
+    assert sums == [14, 9, 10]
+    assert has_sum(root, 14) and not has_sum(root, 7)
+
+def test_diff_and_patch():
+    """Check that patching with a diff reproduces the new tree."""
+    old = from_string("1,2,3,4,,5,6")
+    new = from_string("1,2,9,4,8,5")
+    edits = diff(old, new)
+    assert [(kind, sides) for kind, sides, arg in edits] == [
+        ("insert", ("left", "right")), ("value", ("right",)),
+        ("remove", ("right", "right"))]
+    assert repr(patch(old, edits)) == repr(new)
+    assert diff(old, new) == []
+    assert diff(None, new) == [("insert", (), ([1,2,4,8,9,5], bytearray([3,3,0,0,1,0])))]
+    assert repr(patch(None, diff(None, new))) == repr(new)
+
+def test_load_trees():
+    """Check that bulk loading keeps the input order and reports bad lines."""
+    lines = [tree_string, "", "[1,null,2]", "1,2"] * 3
+    trees, errors = load_trees(lines, processes=2, batch_size=5)
+    assert errors == []
+    assert [repr(tree) for tree in trees[:4]] == [
+        repr_string, "None", "Node(1, left=None, right=Node(2))",
+        "Node(1, left=Node(2))"]
+    assert [repr(tree) for tree in trees] == [repr(tree) for tree in trees[:4]] * 3
+    lines = ['[1,2,null,3]', '"1,2"', '{"a": 1}', '[1,']
+    trees, errors = load_trees(lines, processes=1, ndjson=True, flat=True)
+    assert trees == [[1,2,None,3], [1,2], None, None]
+    assert [index for index, message in errors] == [2, 3]
+
+    class Positive(Node):
+        __slots__ = []
+        def __init__(self, value, *args, **kwargs):
+            if value < 0:
+                raise ValueError("negative value")
+            super(Positive, self).__init__(value, *args, **kwargs)
+    lines = ['1,2', '1,-2', '1', '-1']
+    trees, errors = load_trees(lines, processes=1, batch_size=3, cls=Positive)
+    assert [tree is None for tree in trees] == [False, True, False, True]
+    assert errors == [(1, "negative value"), (3, "negative value")]
+
+def test_query_cache(tree_from_string):
+    """Check that cached results are reused until the tree changes."""
+    root = tree_from_string
+    cache = QueryCache(maxsize=2)
+    paths = cache(all_paths, root)
+    assert cache(all_paths, root) is paths
+    assert cache(max_depth, root) == 3
+    start = generation(root)
+    root.left.left.value = 7
+    assert generation(root) > start
+    assert cache(all_paths, root) is not paths
+    assert cache(to_string, root) == "1,2,3,7,null,5,6"
+    root.left.left.left = Node(8)
+    assert cache(max_depth, root) == 4
+
+def test_concurrent_tree(tree_from_LightNode):
+    """Check that readers only ever see whole transactions."""
+    import threading
+    shared = ConcurrentTree(tree_from_LightNode)
+    seen = []
+
+    def read():
+        for _ in range(200):
+            seen.append(set(node.value for node in shared.traverse("pre")))
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for value in range(10, 60):
+        with shared.transaction() as txn:
+            for sides in [[], ["left"], ["right"], ["left", "left"],
+                          ["right", "left"], ["right", "right"]]:
+                txn.set_value(sides, value)
+    for reader in readers:
+        reader.join()
+    assert shared.version == 50
+    assert all(len(values) == 1 for values in seen if 1 not in values)
+    assert list(tree_from_LightNode.left) == [2, 4]
+    with pytest.raises(ValueError):
+        with shared.transaction() as txn:
+            txn.set_value(["left"], 0)
+            txn.set_value(["left", "right"], 0)
+    assert shared.snapshot().left == 59
+    with shared.transaction() as txn:
+        txn.set_value(["left"], 60)
+    with pytest.raises(ValueError):
+        txn.set_value(["left"], 99)
+    assert shared.snapshot().left == 60
+
+def test_path_index(tree_from_string):
+    """Check path aggregates against the paths from find_path."""
+    root = tree_from_string
+    root.left.left.left = Node(7)
+    index = PathIndex(root)
+    nodes = list(root)
+
+    def expected(a, b, op):
+        lca = get_lca(root, a, b)
+        path = find_path(lca, a)[1:] + find_path(lca, b)
+        return op(node.value for node in path)
+
+    for a in nodes:
+        for b in nodes:
+            assert index.lca(a, b) is (a if a is b else get_lca(root, a, b))
+            for op, func in [("sum", sum), ("min", min), ("max", max)]:
+                assert index.path_aggregate(a, b, op) == expected(a, b, func)
+    index.update(root.left, 20)
+    assert root.left.value == 20
+    assert index.path_aggregate(root.left.left.left, root.right.right, "sum") == 41
+    assert index.path_aggregate(root.left.left.left, root.right.right, "max") == 20
+    with pytest.raises(ValueError):
+        index.path_aggregate(root, Node(1), "sum")
+
+def test_pruned_traversals(tree_from_string):
+    """Check that pruned and bounded traversals skip whole branches."""
+    root = tree_from_string
+    assert [node.value for node in traverse(root, "pre", max_depth=2)] == [1,2,3]
+    assert [[node.value for node in level] for level in
+            traverse(root, "level", prune=lambda node, side: node == 3)] == [
+        [1], [2,3], [4]]
+    bst = from_orders("in-pre", [1,2,3,4,5,6,7], [4,2,1,3,6,5,7])
+    visited = []
+
+    def prune(node, side):
+        visited.append(node.value)
+        return side == "right" and node.value >= 5
+
+    values = []
+    for node in traverse(bst, "in", prune, start=3):
+        if node.value > 5:
+            break
+        values.append(node.value)
+    assert values == [3,4,5]
+    assert 1 not in visited and 7 not in visited
+    with pytest.raises(ValueError):
+        traverse(bst, "pre", start=3)
+
+def test_copy_and_pickle_deep_tree():
+    """Check that deep trees copy and pickle with their links."""
+    import copy
+    import pickle
+    root = node = Node(0)
+    for value in range(1, 5000):
+        node.left, node.right = Node(value), Node(-value)
+        node = node.left
+    connect_nodes(root)
+    for clone in [copy_tree(root), copy.deepcopy(root),
+                  pickle.loads(pickle.dumps(root, -1))]:
+        assert [n.value for n in traverse(clone, "pre")] == [
+            n.value for n in traverse(root, "pre")]
+        deepest = clone
+        while deepest.left is not None:
+            deepest = deepest.left
+        assert deepest.value == 4999 and deepest.next == -4999
+        assert deepest.parent.parent.value == 4997
+    light = pickle.loads(pickle.dumps(from_string(tree_string, cls=LightNode)))
+    assert repr(light) == repr_string.replace("Node", "LightNode")
+
+class TaggedNode(Node):
+    __slots__ = ["tag"]
+
+def test_pickle_shared_nodes(tree_from_string):
+    """Check that nodes of one tree stay shared when pickled together."""
+    import copy
+    import pickle
+    root = tree_from_string
+    a, b, c = pickle.loads(pickle.dumps([root, root.left, root.right.left], -1))
+    assert a.left is b and b.parent is a and a.right.left is c
+    assert c.next is a.right.right
+    clone = copy.deepcopy({"node": root.right, "root": root})
+    assert clone["root"].right is clone["node"]
+    assert clone["node"].parent is clone["root"]
+    shallow = copy.copy(root)
+    assert shallow is not root and shallow.left is root.left
+    tagged = TaggedNode(1)
+    tagged.tag = "x"
+    assert pickle.loads(pickle.dumps(tagged, -1)).tag == "x"
+
+def test_patch_leaves_new_tree_intact():
+    """Check that patching does not take nodes from the new tree."""
+    old, new = from_string("1,2,3"), from_string("1,2,3,4")
+    patched = patch(old, diff(old, new))
+    assert patched.left.left is not new.left.left
+    assert get_path(new.left.left)[0] is new
+    assert get_path(patched.left.left)[0] is patched
+
+def test_diff_compares_values():
+    """Check that values with the same repr still differ."""
+    class Value(object):
+        def __init__(self, number):
+            self.number = number
+        def __eq__(self, other):
+            return self.number == other.number
+        def __ne__(self, other):
+            return self.number != other.number
+        def __repr__(self):
+            return "Value"
+    old, new = Node(Value(1)), Node(Value(2))
+    assert diff(old, new) == [("value", (), new.value)]
+    old = from_string(tree_string, cls=LightNode)
+    new = with_value(old, ["right", "right"], 7)
+    assert diff(old, new) == [("value", ("right", "right"), 7)]
+
+def test_query_cache_keeps_other_trees(tree_from_string):
+    """Check that unrelated trees do not invalidate cached results."""
+    root = tree_from_string
+    cache = QueryCache()
+    paths = cache(all_paths, root)
+    other = from_string(tree_string)
+    other.left.value = 9
+    Node(99)
+    copy_tree(root)
+    assert cache(all_paths, root) is paths
+    subtree = Node(7, left=Node(8))
+    depth = cache(max_depth, subtree)
+    root.left.right = subtree
+    assert cache(all_paths, root) is not paths
+    subtree.left.value = 10
+    assert cache(max_depth, subtree) == depth
+    assert generation(subtree) == generation(root)
+
+def test_concurrent_tree_traverse_options():
+    """Check that traversal options reach the current version."""
+    bst = from_orders("in-pre", [1,2,3,4,5,6,7], [4,2,1,3,6,5,7],
+                      cls=LightNode)
+    shared = ConcurrentTree(bst)
+    assert [node.value for node in shared.traverse("pre", max_depth=2)] == [4,2,6]
+    assert [node.value for node in shared.traverse("in", start=5)] == [5,6,7]
+    prune = lambda node, side: side == "left"
+    assert [node.value for node in shared.traverse("post", prune)] == [7,6,4]
+    assert list(ConcurrentTree().traverse("level")) == []
+
+def test_copy_and_pickle_deep_nodes():
+    """Check that a deep node alone and deep LightNode trees pickle without recursion."""
+    import copy
+    import pickle
+    root = node = Node(0)
+    light_root = light = LightNode(0)
+    for value in range(1, 5000):
+        node.right = Node(value)
+        node = node.right
+        light.left = LightNode(value)
+        light = light.left
+    for clone in [pickle.loads(pickle.dumps(node, -1)), copy.deepcopy(node)]:
+        assert clone.value == 4999 and clone.parent.value == 4998
+        assert get_path(clone)[0] == 0
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        clone = pickle.loads(pickle.dumps(light_root, protocol))
+        assert max_depth(clone) == 5000
+    assert max_depth(copy.deepcopy(light_root)) == 5000
+
+def test_path_index_keeps_one_custom_tree(tree_from_string):
+    """Check that custom aggregates do not pile up segment trees."""
+    root = tree_from_string
+    index = PathIndex(root)
+    index.path_aggregate(root.left.left, root.right.right, "sum")
+    for _ in range(3):
+        assert index.path_aggregate(root.left.left, root.right.right,
+                                    lambda a, b: a * b) == 144
+    assert len(index._trees) == 2
+    index.update(root, 2)
+    assert index.path_aggregate(root.left.left, root.right.right, "sum") == 17
+    with pytest.raises(KeyError):
+        index.path_aggregate(root, root, "avg")
+
+def test_persistent_updates_reject_parent_links(tree_from_LightNode):
+    """Check that nodes with parent links cannot enter a persistent tree."""
+    root = tree_from_LightNode
+    with pytest.raises(TypeError):
+        with_subtree(root, ["left", "right"], Node(8))
+    shared = ConcurrentTree(root)
+    with pytest.raises(TypeError):
+        with shared.transaction() as txn:
+            txn.set_subtree(["left", "right"], Node(8))
+    root.left.right = Node(8, left=Node(9))
+    with pytest.raises(TypeError):
+        with_value(root, ["left", "right", "left"], 0)
+    assert root.left.right.left.parent is root.left.right
+
+def test_persistent_updates_accept_iterators(tree_from_LightNode):
+    """Check that sides may be given as a one-shot iterator."""
+    root = tree_from_LightNode
+    new_root = with_subtree(root, iter(["left", "right"]), LightNode(8))
+    assert new_root.left.right.value == 8
+    with pytest.raises(ValueError) as error:
+        with_value(root, iter(["right", "right", "right"]), 3)
+    assert "('right', 'right', 'right')" in str(error.value)